@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+MODULES = ['opportunistic_planning', 'opportunistic_planning.cli', 'opportunistic_planning.experiments',
+           'opportunistic_planning.optimization', 'opportunistic_planning.prediction',
+           'opportunistic_planning.processing',
+           'opportunistic_planning.statistics', 'opportunistic_planning.visualization']
+
+HEAVY_MODULES = ['matplotlib', 'scipy', 'pandas', 'fastDamerauLevenshtein']
+
+CHECK = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy} if name in sys.modules]
+print(elapsed, ','.join(heavy))
+'''
+
+
+def measure_import(module, repeat=5):
+    '''
+    Measure import time of module in fresh interpreters.
+
+    Parameters
+    ----------
+    module : str
+        Module to import.
+    repeat : int, optional
+        Number of fresh interpreters to start. The default is 5.
+
+    Returns
+    -------
+    best : float
+        Fastest import time in seconds.
+    heavy : list
+        Heavy dependencies loaded by importing module.
+
+    '''
+
+    times = []
+
+    for x in range(0, repeat):
+        output = subprocess.run([sys.executable, '-c', CHECK.format(module=module, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        times.append(float(output[0]))
+        heavy = output[1].split(',') if len(output) > 1 else []
+
+    return min(times), heavy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-time', action='store', type=float, default=0.5,
+                        help='maximum import time per module in seconds')
+    parser.add_argument('--repeat', action='store', type=int, default=5,
+                        help='number of measurements per module')
+    
+    parsed_arguments = parser.parse_args()
+    failed = False
+    
+    for module in MODULES:
+        best, heavy = measure_import(module, parsed_arguments.repeat)
+        print('{:<40} {:8.1f} ms  {}'.format(module, best * 1000, ', '.join(heavy)))
+        
+        if heavy or best > parsed_arguments.max_time:
+            failed = True
+    
+    sys.exit(1 if failed else 0)
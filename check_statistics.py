@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+
+from scipy.stats import ttest_rel, wilcoxon
+from opportunistic_planning import statistics
+
+
+def generate_results(n_episodes=16, seed=0):
+    '''
+    Generate results dataframe (as from calculate_prediction_error) with columns that cover
+    exact and approximate Wilcoxon cases: ties, zero differences and missing values.
+
+    Parameters
+    ----------
+    n_episodes : int, optional
+        Number of episodes (rows). The default is 16.
+    seed : int, optional
+        Seed for random number generator. The default is 0.
+
+    Returns
+    -------
+    results : pandas.DataFrame
+        Results with reference column first.
+
+    '''
+
+    rng = np.random.default_rng(seed)
+    reference = rng.integers(0, 6, n_episodes).astype(float)
+
+    columns = {'reference': reference,
+               'continuous': reference + rng.normal(0.5, 1.0, n_episodes),
+               'ties and zeros': reference + rng.integers(-1, 3, n_episodes),
+               'missing values': reference + rng.normal(-0.3, 1.0, n_episodes),
+               'shifted': reference + rng.normal(0.2, 1.0, n_episodes)}
+    columns['missing values'][[2, 7]] = np.nan
+
+    results = pd.DataFrame(columns)
+    results['error'] = 0.5
+    results['ID'] = ['e' + str(row) for row in range(0, n_episodes)]
+
+    return results
+
+
+def check_paired_tests(results, tolerance=1e-8):
+    '''
+    Compare paired_tests to scipy.stats.wilcoxon/ttest_rel column by column.
+
+    Returns
+    -------
+    failures : list
+        Description of every mismatch.
+
+    '''
+
+    failures = []
+    reference = results['reference'].to_numpy(dtype=float)
+
+    for test in ['wilcoxon', 'ttest']:
+        comparison = statistics.paired_tests(results, reference='reference', test=test)
+
+        for column in comparison.index:
+            other = results[column].to_numpy(dtype=float)
+            valid = ~np.isnan(reference) & ~np.isnan(other)
+            differences = reference[valid] - other[valid]
+
+            if test == 'wilcoxon':
+                nonzero = differences[differences != 0]
+                exact = len(nonzero) <= statistics.EXACT_WILCOXON_MAX_N and \
+                    len(np.unique(np.abs(nonzero))) == len(nonzero) and len(nonzero) == len(differences)
+                expected = wilcoxon(differences, zero_method='wilcox', correction=False,
+                                    method='exact' if exact else 'approx')
+            else:
+                expected = ttest_rel(reference[valid], other[valid])
+
+            for name, value in [('statistic', expected.statistic), ('p_value', expected.pvalue)]:
+                if abs(comparison.at[column, name] - value) > tolerance:
+                    failures.append('{} {} {}: {} != scipy {}'.format(test, column, name,
+                                                                      comparison.at[column, name], value))
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--episodes', action='store', type=int, nargs='+', default=[16, 80],
+                        help='numbers of episodes to check (exact and approximate Wilcoxon)')
+    
+    parsed_arguments = parser.parse_args()
+    failures = []
+    
+    for n_episodes in parsed_arguments.episodes:
+        failures.extend(check_paired_tests(generate_results(n_episodes)))
+    
+    for failure in failures:
+        print(failure)
+    
+    print('{} mismatches with scipy'.format(len(failures)))
+    sys.exit(1 if failures else 0)
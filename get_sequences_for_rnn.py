@@ -9,6 +9,8 @@ Created on Thu Aug 26 12:59:53 2021
 import argparse
 import pandas as pd
 
+from opportunistic_planning.processing import get_sequences, save_sequences
+
 
 def read_data(input_file):
     dataframe = pd.read_csv(input_file, header=0)
@@ -16,21 +18,12 @@ def read_data(input_file):
     return dataframe
 
 
-def get_sequences(dataframe):
-    return [dataframe.at[row, 'sequence'] for row in range(0, len(dataframe))]
-
-
-def save_to_file(sequence_list):
-    with open('test_data_rnn.txt', 'w') as file:
-        for sequence in sequence_list:
-            file.write(sequence)
-            file.write('\n')
-            
-            
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('filename', action='store', help='input csv file \
                         to process')
+    parser.add_argument('-o', '--output', action='store', default='test_data_rnn.txt',
+                        help='output text file (default: test_data_rnn.txt)')
                         
     parsed_arguments = parser.parse_args()
     
@@ -38,4 +31,4 @@ if __name__ == "__main__":
     
     dataframe = read_data(input_file)
     sequence_list = get_sequences(dataframe)
-    save_to_file(sequence_list)
\ No newline at end of file
+    save_sequences(sequence_list, parsed_arguments.output)
\ No newline at end of file
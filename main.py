@@ -4,8 +4,7 @@
 import numpy as np
 import pandas as pd
 
-from opportunistic_planning import processing, visualization
-from scipy.stats import friedmanchisquare, wilcoxon
+from opportunistic_planning import processing, statistics, visualization
 
 # read in data
 data = pd.read_csv('test_data.csv', header=0)
@@ -20,5 +19,11 @@ results = processing.calculate_prediction_error(data, distances_dict, error_func
 # return parameter combination with lowest prediction error
 lowest_mean, lowest_mean_idx, lowest_median, results_mean = processing.get_lowest_error(results)
 
+# bootstrap confidence intervals for mean error of all parameter combinations
+ci = statistics.bootstrap_ci(results, statistic='mean', n_bootstrap=1000, n_jobs=1)
+
+# compare best parameter combination to all other combinations
+comparison = statistics.paired_tests(results, reference=lowest_mean_idx[0], test='wilcoxon')
+
 # plot error values clustered by dimension
 visualization.plot_dimensions(results)
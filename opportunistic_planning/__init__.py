@@ -0,0 +1,12 @@
+import importlib
+
+
+__all__ = ['experiments', 'optimization', 'prediction', 'processing', 'statistics', 'visualization']
+
+
+def __getattr__(name):
+    # load submodules (and their dependencies) on first attribute access only
+    if name in __all__:
+        return importlib.import_module('opportunistic_planning.' + name)
+    
+    raise AttributeError("module 'opportunistic_planning' has no attribute '{}'".format(name))
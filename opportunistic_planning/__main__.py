@@ -0,0 +1,5 @@
+from opportunistic_planning.cli import main
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+from opportunistic_planning import experiments
+
+
+def main(argv=None):
+    '''
+    Command line entry point: fit, predict or export for all datasets/experiments in config.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments. The default is None (sys.argv).
+
+    Returns
+    -------
+    None.
+
+    '''
+
+    parser = argparse.ArgumentParser(prog='python -m opportunistic_planning')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fit_parser = subparsers.add_parser('fit', help='calculate prediction error for all parameter \
+                                       combinations and save results')
+    predict_parser = subparsers.add_parser('predict', help='predict sequences with given or best \
+                                           parameter combination')
+    export_parser = subparsers.add_parser('export', help='save observed sequences to text files \
+                                          (e.g. for RNN baseline)')
+
+    for subparser in [fit_parser, predict_parser, export_parser]:
+        subparser.add_argument('config', action='store', help='json config file')
+        subparser.add_argument('--output-dir', action='store', help='overrides output_dir of config')
+
+    fit_parser.add_argument('--workers', action='store', type=int, help='overrides workers of config')
+    predict_parser.add_argument('--parameters', action='store', help="parameter combination, e.g. \
+                                'c: 1.2; k: 0.3,0.4,1.5; xyz' (default: best combination from fit)")
+
+    parsed_arguments = parser.parse_args(argv)
+    config = experiments.read_config(parsed_arguments.config)
+
+    if parsed_arguments.output_dir is not None:
+        config['output_dir'] = parsed_arguments.output_dir
+
+    if parsed_arguments.command == 'fit':
+        if parsed_arguments.workers is not None:
+            config['workers'] = parsed_arguments.workers
+
+        summaries = experiments.run_fit(config)
+
+        for (dataset, experiment), summary in summaries.items():
+            print('{} / {}: lowest mean {:.3f} ({}), lowest median {:.3f}'.format(
+                dataset, experiment, summary['lowest_mean'], summary['parameters'], summary['lowest_median']))
+
+    elif parsed_arguments.command == 'predict':
+        for file in experiments.run_predict(config, parsed_arguments.parameters):
+            print(file)
+
+    elif parsed_arguments.command == 'export':
+        for file in experiments.run_export(config):
+            print(file)
@@ -0,0 +1,370 @@
+import json
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from opportunistic_planning import processing
+from opportunistic_planning.prediction import predict_editdist
+
+
+# settings used for every experiment unless given in config/experiment
+DEFAULT_SETTINGS = {'error_function': 'prequential',
+                    'n': 10,
+                    'dimensions': [[2, 'xy'], [3, 'xyz']],
+                    'parameter_grid': None,
+                    'workers': 1,
+                    'chunks_per_worker': 4,
+                    'output_dir': '.'}
+
+# settings that can differ between experiments
+EXPERIMENT_SETTINGS = ['error_function', 'n', 'dimensions', 'parameter_grid']
+
+# datasets and distances shared with worker processes (set once per process by _init_worker)
+_worker_datasets = None
+_worker_distances = None
+
+
+def read_config(file):
+    '''
+    Read experiment configuration from json file.
+
+    Example:
+        {"datasets": {"test": {"path": "test_data.csv", "use_string_for_seq": true}},
+         "workers": 4, "output_dir": "results", "n": 10,
+         "experiments": [{"name": "prequential", "error_function": "prequential",
+                          "dimensions": [[2, "xy"], [3, "xyz"]]},
+                         {"name": "editdist", "error_function": "editdist",
+                          "parameter_grid": {"c": [1.0, 1.5, 2.0]}}]}
+
+    Relative dataset paths and output_dir are resolved against the directory of the
+    config file.
+
+    Parameters
+    ----------
+    file : str
+        Path to json file.
+
+    Raises
+    ------
+    Exception if no datasets given, experiment uses unknown dataset or error function,
+    or experiment has no dimensions.
+
+    Returns
+    -------
+    config : dictionary
+        Configuration with defaults filled in: datasets (name -> path, use_string_for_seq),
+        experiments (list of settings incl. name and datasets), workers, output_dir.
+
+    '''
+
+    with open(file) as config_file:
+        raw = json.load(config_file)
+
+    if not raw.get('datasets'):
+        raise Exception('No datasets given in config {}'.format(file))
+
+    config_dir = os.path.dirname(file)
+    datasets = {}
+
+    for name, dataset in raw['datasets'].items():
+        if isinstance(dataset, str):
+            dataset = {'path': dataset}
+
+        datasets[name] = {'path': os.path.join(config_dir, dataset['path']),
+                          'use_string_for_seq': dataset.get('use_string_for_seq',
+                                                            raw.get('use_string_for_seq', False))}
+
+    settings = dict(DEFAULT_SETTINGS, **{key: value for key, value in raw.items()
+                                         if key not in ('datasets', 'experiments')})
+    experiments = []
+
+    for number, experiment in enumerate(raw.get('experiments', [{}])):
+        experiment = dict({key: settings[key] for key in EXPERIMENT_SETTINGS}, **experiment)
+        experiment.setdefault('name', 'experiment' + str(number))
+        experiment.setdefault('datasets', list(datasets.keys()))
+
+        for name in experiment['datasets']:
+            if name not in datasets:
+                raise Exception('Unknown dataset {} in experiment {}'.format(name, experiment['name']))
+
+        if experiment['error_function'] not in ('prequential', 'editdist'):
+            raise Exception('Unknown error function {} in experiment {}, use prequential or editdist'.format(
+                experiment['error_function'], experiment['name']))
+
+        if not experiment['dimensions']:
+            raise Exception('No dimensions given in experiment {}'.format(experiment['name']))
+
+        experiments.append(experiment)
+
+    config = {'datasets': datasets, 'experiments': experiments,
+              'workers': settings['workers'], 'chunks_per_worker': settings['chunks_per_worker'],
+              'output_dir': os.path.join(config_dir, settings['output_dir'])}
+
+    return config
+
+
+def load_datasets(config):
+    '''
+    Read all datasets and calculate distances once per dataset (for all dimensions used
+    by any experiment), shared by all experiments.
+
+    Parameters
+    ----------
+    config : dictionary
+        Configuration generated with read_config.
+
+    Returns
+    -------
+    datasets : dictionary
+        Dataset name -> pandas.DataFrame.
+    distances : dictionary
+        Dataset name -> distances dictionary (see generate_distances_dict).
+
+    '''
+
+    datasets = {}
+    distances = {}
+
+    for name, dataset in config['datasets'].items():
+        dimensions = []
+
+        for experiment in config['experiments']:
+            if name in experiment['datasets']:
+                dimensions.extend(dim for dim in experiment['dimensions'] if dim not in dimensions)
+
+        datasets[name] = processing.read_data(dataset['path'], dataset['use_string_for_seq'])
+        distances[name] = processing.generate_distances_dict(datasets[name], dataset['use_string_for_seq'],
+                                                             dimensions=dimensions)
+
+    return datasets, distances
+
+
+def _grid_size(experiment):
+    grid = processing.get_parameter_grid(experiment['parameter_grid'])
+
+    return len(grid['c']) * len(grid['k']) * len(grid['k_food']) * len(experiment['dimensions'])
+
+
+def schedule_jobs(config, datasets):
+    '''
+    Split all dataset x experiment combinations into chunks of episodes with similar
+    estimated cost (sequence length^2 x iterations x parameter combinations), ordered
+    by decreasing cost so that workers finish at about the same time.
+
+    Parameters
+    ----------
+    config : dictionary
+        Configuration generated with read_config.
+    datasets : dictionary
+        Dataset name -> pandas.DataFrame.
+
+    Returns
+    -------
+    jobs : list of dictionaries
+        Experiment settings, dataset name, row numbers, estimated cost and
+        use_string_for_seq of each job.
+
+    '''
+
+    costs = []
+
+    for experiment in config['experiments']:
+        factor = experiment['n'] * _grid_size(experiment)
+
+        for name in experiment['datasets']:
+            data = datasets[name]
+            use_string_for_seq = config['datasets'][name]['use_string_for_seq']
+            lengths = np.array([len(processing.parse_episode(data, row, use_string_for_seq=use_string_for_seq)
+                                    ['objects']) for row in range(0, len(data))])
+            costs.append((experiment, name, lengths ** 2 * factor))
+
+    total = sum(episode_costs.sum() for experiment, name, episode_costs in costs)
+    target = total / max(1, config['workers'] * config['chunks_per_worker'])
+    jobs = []
+
+    for experiment, name, episode_costs in costs:
+        rows = []
+        cost = 0
+
+        for row, episode_cost in enumerate(episode_costs):
+            rows.append(row)
+            cost += episode_cost
+
+            if cost >= target or row == len(episode_costs) - 1:
+                jobs.append({'experiment': experiment, 'dataset': name, 'rows': rows, 'cost': cost,
+                             'use_string_for_seq': config['datasets'][name]['use_string_for_seq']})
+                rows = []
+                cost = 0
+
+    jobs.sort(key=lambda job: job['cost'], reverse=True)
+
+    return jobs
+
+
+def _init_worker(datasets, distances):
+    global _worker_datasets, _worker_distances
+    _worker_datasets = datasets
+    _worker_distances = distances
+
+
+def _run_job(job):
+    experiment = job['experiment']
+    data = _worker_datasets[job['dataset']].iloc[job['rows']].reset_index(drop=True)
+
+    results = processing.calculate_prediction_error(data, _worker_distances[job['dataset']],
+                                                    experiment['error_function'], n=experiment['n'],
+                                                    dimensions=experiment['dimensions'],
+                                                    use_string_for_seq=job['use_string_for_seq'],
+                                                    parameter_grid=experiment['parameter_grid'])
+    results.index = job['rows']
+
+    return experiment['name'], job['dataset'], results
+
+
+def _output_path(config, dataset, experiment, suffix):
+    return os.path.join(config['output_dir'], '{}_{}_{}'.format(dataset, experiment, suffix))
+
+
+def run_fit(config):
+    '''
+    Calculate prediction error for all dataset x experiment combinations (in parallel if
+    workers > 1), save results and parameter combination with lowest mean error.
+
+    Parameters
+    ----------
+    config : dictionary
+        Configuration generated with read_config.
+
+    Returns
+    -------
+    summaries : dictionary
+        (dataset, experiment) -> lowest mean, parameters with lowest mean, lowest median.
+
+    '''
+
+    import pandas as pd
+
+    datasets, distances = load_datasets(config)
+    jobs = schedule_jobs(config, datasets)
+
+    if config['workers'] > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=config['workers'], initializer=_init_worker,
+                                 initargs=(datasets, distances)) as executor:
+            outputs = list(executor.map(_run_job, jobs))
+    else:
+        _init_worker(datasets, distances)
+        outputs = [_run_job(job) for job in jobs]
+
+    chunks = {}
+
+    for experiment, dataset, results in outputs:
+        chunks.setdefault((dataset, experiment), []).append(results)
+
+    os.makedirs(config['output_dir'], exist_ok=True)
+    summaries = {}
+
+    for (dataset, experiment), results in chunks.items():
+        results = pd.concat(results).sort_index()
+        processing.save_results(results, _output_path(config, dataset, experiment, 'results.csv'))
+
+        lowest_mean, lowest_mean_idx, lowest_median, _ = processing.get_lowest_error(results.copy())
+        summary = {'lowest_mean': float(lowest_mean), 'parameters': lowest_mean_idx[0],
+                   'lowest_median': float(lowest_median)}
+
+        with open(_output_path(config, dataset, experiment, 'summary.json'), 'w') as file:
+            json.dump(summary, file, indent=4)
+
+        summaries[(dataset, experiment)] = summary
+
+    return summaries
+
+
+def run_predict(config, params=None):
+    '''
+    Predict sequences for all episodes with given parameter combination (or the one with
+    lowest mean error saved by run_fit) and save them to csv.
+
+    Parameters
+    ----------
+    config : dictionary
+        Configuration generated with read_config.
+    params : str, optional
+        Parameter combination as results column name (e.g., 'c: 1.2; k: 0.3,0.4,1.5; xyz').
+        The default is None (use summary saved by run_fit).
+
+    Returns
+    -------
+    files : list
+        Paths of saved prediction files.
+
+    '''
+
+    import pandas as pd
+
+    datasets, distances = load_datasets(config)
+    os.makedirs(config['output_dir'], exist_ok=True)
+    files = []
+
+    for experiment in config['experiments']:
+        for name in experiment['datasets']:
+            data = datasets[name]
+            use_string_for_seq = config['datasets'][name]['use_string_for_seq']
+            separator = '' if use_string_for_seq == True else ','
+
+            if params is None:
+                with open(_output_path(config, name, experiment['name'], 'summary.json')) as file:
+                    parameters = processing.parse_parameters(json.load(file)['parameters'])
+            else:
+                parameters = processing.parse_parameters(params)
+
+            if parameters['dimension'][1] not in distances[name]:
+                distances[name].update(processing.generate_distances_dict(
+                    data, use_string_for_seq, dimensions=[parameters['dimension']]))
+
+            predictions = []
+
+            for row in range(0, len(data)):
+                episode = processing.parse_episode(data, row, use_string_for_seq=use_string_for_seq)
+                c1, k1 = processing.get_parameter_dicts(episode, parameters['c'], parameters['k_strong'],
+                                                        parameters['k_mid'], parameters['k_food'])
+                prediction = predict_editdist(distances[name], episode['ID'], episode['objects'],
+                                              episode['coordinates'], episode['start_coordinates'],
+                                              episode['sequence'], c1, k1, parameters['dimension'])
+                predictions.append({'ID': episode['ID'], 'sequence': separator.join(episode['sequence']),
+                                    'prediction': separator.join(prediction)})
+
+            file = _output_path(config, name, experiment['name'], 'predictions.csv')
+            pd.DataFrame(predictions).to_csv(file, index=False)
+            files.append(file)
+
+    return files
+
+
+def run_export(config):
+    '''
+    Save observed sequences of all datasets to text files (one sequence per line, e.g. as
+    input for RNN baseline).
+
+    Parameters
+    ----------
+    config : dictionary
+        Configuration generated with read_config.
+
+    Returns
+    -------
+    files : list
+        Paths of saved sequence files.
+
+    '''
+
+    import pandas as pd
+
+    os.makedirs(config['output_dir'], exist_ok=True)
+    files = []
+
+    for name, dataset in config['datasets'].items():
+        data = pd.read_csv(dataset['path'], header=0)
+        file = os.path.join(config['output_dir'], name + '_rnn.txt')
+        processing.save_sequences(processing.get_sequences(data), file)
+        files.append(file)
+
+    return files
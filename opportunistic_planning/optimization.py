@@ -0,0 +1,458 @@
+import random
+import numpy as np
+from opportunistic_planning import processing
+from opportunistic_planning.prediction import get_median_error
+
+
+# search range for per-category parameters
+DEFAULT_BOUNDS = {'c': (1.0, 2.0), 'k_strong': (0.0, 2.0), 'k_mid': (0.0, 2.0), 'k_food': (0.0, 2.0)}
+
+# relational dependencies with their own k (same precedence as processing.get_parameter_dicts)
+RELATIONS = ['k_strong', 'k_mid', 'k_food']
+
+
+def prepare_episodes(data, categories=None, seqcol='sequence', coords='coordinates',
+                     use_string_for_seq=False):
+    '''
+    Parse all episodes once and determine which parameters influence each episode:
+    k of the category and relational dependency (strong_k, mid_k, food_k) of every object
+    with a relational dependency, c of the category of every contained object.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Generated with read_data function from csv, contains information on objects and sequence.
+    categories : dictionary, optional
+        Object -> category. The default is None (every object is its own category).
+    seqcol : str, optional
+        Column of dataframe containing sequence. The default is 'sequence'.
+    coords : str, optional
+        Column of dataframe containing coordinates. The default is 'coordinates'.
+    use_string_for_seq : bool, optional
+        Sequence is a string of single-character objects. The default is False.
+
+    Returns
+    -------
+    episodes : list of dictionaries
+        Episode information (see parse_episode) with row, categories (object -> category),
+        relations (object -> k_strong/k_mid/k_food or None) and keys (relevant parameters,
+        e.g. ('c', 'p'), ('k_mid', 'p')).
+
+    '''
+
+    episodes = []
+
+    for row in range(0, len(data)):
+        episode = processing.parse_episode(data, row, seqcol, coords, use_string_for_seq)
+        episode['row'] = row
+        episode['categories'] = {obj: categories.get(obj, obj) if categories else obj
+                                 for obj in episode['objects']}
+
+        episode['relations'] = {obj: 'k_strong' if obj in episode['strong_k'] else 'k_mid'
+                                if obj in episode['mid_k'] else 'k_food' if obj in episode['food_k']
+                                else None for obj in episode['objects']}
+
+        keys = {(relation, episode['categories'][obj]) for obj, relation in episode['relations'].items()
+                if relation is not None}
+        keys.update(('c', episode['categories'][obj]) for obj in episode['objects']
+                    if obj in episode['containment'])
+        episode['keys'] = sorted(keys)
+
+        episodes.append(episode)
+
+    return episodes
+
+
+def get_category_parameter_dicts(episode, parameters):
+    '''
+    Set c and k for all objects in episode from per-category parameter values
+    (c only for contained objects, k only for objects with relational dependencies,
+    1.0 otherwise or if parameter not given).
+
+    Parameters
+    ----------
+    episode : dictionary
+        Episode information generated with prepare_episodes.
+    parameters : dictionary
+        (parameter, category) -> value, e.g. {('c', 'p'): 1.3, ('k_mid', 'p'): 0.4}.
+
+    Returns
+    -------
+    c1 : dictionary
+        Parameter values for containment for all objects.
+    k1 : dictionary
+        Parameter values for relational dependencies for all objects.
+
+    '''
+
+    c1 = {obj: parameters.get(('c', episode['categories'][obj]), 1.0) if obj in episode['containment']
+          else 1.0 for obj in episode['objects']}
+    k1 = {obj: parameters.get((episode['relations'][obj], episode['categories'][obj]), 1.0)
+          if episode['relations'][obj] is not None else 1.0 for obj in episode['objects']}
+
+    return c1, k1
+
+
+def episode_error(episode, parameters, distances_dict, cache, error_function='prequential',
+                  dimension=[3, 'xyz'], n=10):
+    '''
+    Return median error of episode, cached by the values of the parameters relevant
+    to the episode (changing other categories does not trigger re-scoring).
+
+    Parameters
+    ----------
+    episode : dictionary
+        Episode information generated with prepare_episodes.
+    parameters : dictionary
+        (parameter, category) -> value.
+    distances_dict : dictionary
+        Dictionary containing distances between objects in all dimensions.
+    cache : dictionary
+        Cache of episode errors, updated in place.
+    error_function : str, optional
+        Options: editdist, prequential. The default is 'prequential'.
+    dimension : list [int, str], optional
+        Dimension in which to consider distances. The default is [3, 'xyz'].
+    n : int, optional
+        Number of iterations. The default is 10.
+
+    Returns
+    -------
+    error : float
+        Median error value.
+
+    '''
+
+    key = (episode['row'],) + tuple(parameters.get(param, 1.0) for param in episode['keys'])
+
+    if key not in cache:
+        c1, k1 = get_category_parameter_dicts(episode, parameters)
+        cache[key] = get_median_error(error_function, episode['row'], episode['ID'], episode['objects'],
+                                      episode['coordinates'], episode['start_coordinates'], c1, k1,
+                                      dimension, episode['sequence'], distances_dict, n)
+
+    return cache[key]
+
+
+def evaluate(parameters, episodes, distances_dict, cache, error_function='prequential',
+             dimension=[3, 'xyz'], n=10):
+    '''
+    Return errors of all episodes for given per-category parameter values.
+
+    Returns
+    -------
+    errors : numpy.ndarray
+        Median error per episode.
+
+    '''
+
+    return np.array([episode_error(episode, parameters, distances_dict, cache, error_function,
+                                   dimension, n) for episode in episodes])
+
+
+def rescore(parameters, episodes, distances_dict, error_function='prequential', dimension=[3, 'xyz'],
+            n=10, repeats=5):
+    '''
+    Return errors of all episodes averaged over repeats evaluations with an empty cache
+    (unbiased by the random tie-breaking draws kept during search).
+
+    Returns
+    -------
+    errors : numpy.ndarray
+        Mean of median error per episode over repeats.
+
+    '''
+
+    return np.mean([evaluate(parameters, episodes, distances_dict, {}, error_function, dimension, n)
+                    for x in range(0, repeats)], axis=0)
+
+
+def tied_parameters(keys, tied):
+    '''
+    Set per-category parameters to the tied model (same value for all categories).
+
+    Parameters
+    ----------
+    keys : list
+        (parameter, category) keys.
+    tied : dictionary
+        c, k_strong, k_mid and k_food (e.g., from processing.parse_parameters).
+
+    Returns
+    -------
+    parameters : dictionary
+        (parameter, category) -> value.
+
+    '''
+
+    return {key: tied[key[0]] for key in keys}
+
+
+def tied_grid_search(keys, episodes, distances_dict, cache, error_function='prequential',
+                     dimension=[3, 'xyz'], n=10, parameter_grid=None):
+    '''
+    Return tied model with lowest mean error on the grid of calculate_prediction_error
+    (starting point for per-category search).
+
+    Returns
+    -------
+    parameters : dictionary
+        (parameter, category) -> value of best tied model.
+
+    '''
+
+    grid = processing.get_parameter_grid(parameter_grid)
+    best_error = None
+
+    for k_food in grid['k_food']:
+        for k_strong in grid['k']:
+            for c in grid['c']:
+                tied = {'c': c, 'k_strong': k_strong, 'k_mid': round(k_strong + 0.1, 6), 'k_food': k_food}
+                parameters = tied_parameters(keys, tied)
+                error = np.nanmean(evaluate(parameters, episodes, distances_dict, cache,
+                                            error_function, dimension, n))
+
+                if best_error is None or error < best_error:
+                    best_error = error
+                    best = parameters
+
+    return best
+
+
+def coordinate_descent(parameters, episodes, distances_dict, cache, error_function='prequential',
+                       dimension=[3, 'xyz'], n=10, free=None, bounds=None, step=0.2, min_step=0.025,
+                       max_sweeps=50):
+    '''
+    Compass search over one parameter at a time: try value +/- step, keep first improvement,
+    halve step after a sweep without improvement. Only episodes containing the category of
+    the changed parameter are re-scored.
+
+    Parameters
+    ----------
+    parameters : dictionary
+        Initial (parameter, category) -> value.
+    episodes : list of dictionaries
+        Generated with prepare_episodes.
+    distances_dict : dictionary
+        Dictionary containing distances between objects in all dimensions.
+    cache : dictionary
+        Cache of episode errors, updated in place.
+    error_function : str, optional
+        Options: editdist, prequential. The default is 'prequential'.
+    dimension : list [int, str], optional
+        Dimension in which to consider distances. The default is [3, 'xyz'].
+    n : int, optional
+        Number of iterations. The default is 10.
+    free : list, optional
+        Keys to optimize, others stay fixed. The default is None (all keys).
+    bounds : dictionary, optional
+        c/k_strong/k_mid/k_food -> (min, max). The default is None (DEFAULT_BOUNDS).
+    step : float, optional
+        Initial step size. The default is 0.2.
+    min_step : float, optional
+        Search stops when step size falls below min_step. The default is 0.025.
+    max_sweeps : int, optional
+        Maximum number of sweeps over all parameters. The default is 50.
+
+    Returns
+    -------
+    parameters : dictionary
+        Optimized (parameter, category) -> value.
+    errors : numpy.ndarray
+        Median error per episode for optimized parameters.
+
+    '''
+
+    bounds = dict(DEFAULT_BOUNDS, **(bounds or {}))
+    parameters = dict(parameters)
+    affected = {key: [i for i, episode in enumerate(episodes) if key in episode['keys']]
+                for key in (parameters if free is None else free)}
+    errors = evaluate(parameters, episodes, distances_dict, cache, error_function, dimension, n)
+    sweeps = 0
+
+    while step >= min_step and sweeps < max_sweeps:
+        improved = False
+
+        for key, rows in affected.items():
+            lower, upper = bounds[key[0]]
+
+            for direction in [1, -1]:
+                value = round(min(max(parameters[key] + direction * step, lower), upper), 6)
+
+                if value == parameters[key]:
+                    continue
+
+                trial = dict(parameters)
+                trial[key] = value
+                trial_errors = np.array([episode_error(episodes[i], trial, distances_dict, cache,
+                                                       error_function, dimension, n) for i in rows])
+
+                if np.nansum(trial_errors) < np.nansum(errors[rows]):
+                    parameters = trial
+                    errors[rows] = trial_errors
+                    improved = True
+                    break
+
+        sweeps += 1
+
+        if improved == False:
+            step = step / 2
+
+    return parameters, errors
+
+
+def nelder_mead(parameters, episodes, distances_dict, cache, error_function='prequential',
+                dimension=[3, 'xyz'], n=10, free=None, bounds=None, step=0.2, max_evaluations=2000,
+                precision=3):
+    '''
+    Nelder-Mead search over all parameters at once (scipy.optimize.minimize), evaluated
+    through the episode error cache.
+
+    Parameters
+    ----------
+    parameters, episodes, distances_dict, cache, error_function, dimension, n, free, bounds
+        See coordinate_descent.
+    step : float, optional
+        Edge length of initial simplex. The default is 0.2.
+    max_evaluations : int, optional
+        Maximum number of objective evaluations. The default is 2000.
+    precision : int, optional
+        Parameter values are rounded to this many decimals before evaluation
+        (increases cache hits). The default is 3.
+
+    Returns
+    -------
+    parameters : dictionary
+        Optimized (parameter, category) -> value.
+    errors : numpy.ndarray
+        Median error per episode for optimized parameters.
+
+    '''
+
+    from scipy.optimize import minimize
+
+    bounds = dict(DEFAULT_BOUNDS, **(bounds or {}))
+    keys = list(parameters.keys() if free is None else free)
+    limits = [bounds[key[0]] for key in keys]
+    x0 = np.array([parameters[key] for key in keys], dtype=float)
+
+    # initial simplex: move each parameter by step, towards the inside of the bounds
+    simplex = np.tile(x0, (len(keys) + 1, 1))
+
+    for i, (lower, upper) in enumerate(limits):
+        simplex[i + 1, i] += step if x0[i] + step <= upper else -step
+
+    def to_parameters(x):
+        trial = dict(parameters)
+        trial.update({key: round(float(value), precision) for key, value in zip(keys, x)})
+
+        return trial
+
+    def objective(x):
+        return np.nanmean(evaluate(to_parameters(x), episodes, distances_dict, cache,
+                                   error_function, dimension, n))
+
+    result = minimize(objective, x0, method='Nelder-Mead', bounds=limits,
+                      options={'initial_simplex': simplex, 'maxfev': max_evaluations})
+
+    parameters = to_parameters(result.x)
+    errors = evaluate(parameters, episodes, distances_dict, cache, error_function, dimension, n)
+
+    return parameters, errors
+
+
+def optimize_parameters(data, distances_dict, error_function='prequential', dimension=[3, 'xyz'],
+                        n=10, method='coordinate_descent', categories=None, fit=['c', 'k'],
+                        initial=None, bounds=None, use_string_for_seq=False, seed=None, repeats=5,
+                        parameter_grid=None, **options):
+    '''
+    Fit independent c/k per object category with derivative-free search instead of the
+    exhaustive grid in calculate_prediction_error. The relational structure of the tied
+    model is kept: c applies to contained objects, k_strong/k_mid/k_food to objects with
+    the corresponding relational dependency, and search starts from the tied model.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Generated with read_data function from csv, contains information on objects and sequence.
+    distances_dict : dictionary
+        Dictionary containing distances between objects (must contain dimension).
+    error_function : str, optional
+        Options: editdist, prequential. The default is 'prequential'.
+    dimension : list [int, str], optional
+        Dimension in which to consider distances. The default is [3, 'xyz'].
+    n : int, optional
+        Number of iterations per episode evaluation. The default is 10.
+    method : str, optional
+        Options: coordinate_descent, nelder_mead. The default is 'coordinate_descent'.
+    categories : dictionary, optional
+        Object -> category. The default is None (every object is its own category).
+    fit : list, optional
+        Parameters to fit per category ('c', 'k'), others stay at their initial (tied) value.
+        The default is ['c', 'k'].
+    initial : str or dictionary, optional
+        Tied model as results column name (e.g., lowest_mean_idx[0] from get_lowest_error) or
+        (parameter, category) -> value. The default is None (best tied model on parameter_grid).
+    bounds : dictionary, optional
+        c/k_strong/k_mid/k_food -> (min, max). The default is None (DEFAULT_BOUNDS).
+    use_string_for_seq : bool, optional
+        Sequence is a string of single-character objects. The default is False.
+    seed : int, optional
+        Seed for random choice between items with same cost. The default is None.
+    repeats : int, optional
+        Number of evaluations with empty cache used to report errors. The default is 5.
+    parameter_grid : dictionary, optional
+        Grid for tied model if initial is None (see processing.get_parameter_grid).
+        The default is None.
+    **options
+        Passed to coordinate_descent or nelder_mead (e.g., step, max_sweeps, max_evaluations).
+
+    Raises
+    ------
+    Exception if method unknown.
+
+    Returns
+    -------
+    result : dictionary
+        parameters ((parameter, category) -> value), error (mean error over episodes) and
+        errors (per episode) re-scored with empty cache (repeats draws), initial_parameters
+        and initial_error of the tied starting point (re-scored the same way), and
+        evaluations (number of episodes scored during search).
+
+    '''
+
+    methods = {'coordinate_descent': coordinate_descent, 'nelder_mead': nelder_mead}
+
+    if method not in methods:
+        raise Exception('Unknown method {}, use coordinate_descent or nelder_mead'.format(method))
+
+    if seed is not None:
+        random.seed(seed)
+
+    episodes = prepare_episodes(data, categories, use_string_for_seq=use_string_for_seq)
+
+    # only parameters that influence at least one episode
+    keys = sorted({key for episode in episodes for key in episode['keys']})
+    free = [key for key in keys if key[0] in fit or (key[0] in RELATIONS and 'k' in fit)]
+    cache = {}
+
+    if initial is None:
+        initial = tied_grid_search(keys, episodes, distances_dict, cache, error_function, dimension, n,
+                                   parameter_grid)
+    elif isinstance(initial, str):
+        initial = tied_parameters(keys, processing.parse_parameters(initial))
+
+    initial = {key: initial.get(key, 1.0) for key in keys}
+
+    parameters, errors = methods[method](initial, episodes, distances_dict, cache, error_function,
+                                         dimension, n, free=free, bounds=bounds, **options)
+
+    # report errors with fresh draws (search keeps the lowest cached draws)
+    errors = rescore(parameters, episodes, distances_dict, error_function, dimension, n, repeats)
+    initial_errors = rescore(initial, episodes, distances_dict, error_function, dimension, n, repeats)
+
+    result = {'parameters': parameters, 'error': float(np.nanmean(errors)), 'errors': errors,
+              'initial_parameters': initial, 'initial_error': float(np.nanmean(initial_errors)),
+              'evaluations': len(cache)}
+
+    return result
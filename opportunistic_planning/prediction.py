@@ -1,6 +1,5 @@
 import numpy as np
 import random
-from fastDamerauLevenshtein import damerauLevenshtein
 from collections import Counter
 
 def filter_for_dimension(dimension, coordinates, start_coordinates):
@@ -241,6 +240,9 @@ def get_median_error(error_function, row, ID, objects, coordinates, start_coordi
 
     error_list = []
 
+    if error_function == 'editdist':
+        from fastDamerauLevenshtein import damerauLevenshtein
+
     for x in range(0, n):
         # get median error using edit distance (predict whole sequence, then compare)
         if error_function == 'editdist':
@@ -1,13 +1,50 @@
 import ast
 import numpy as np
-import pandas as pd
 from opportunistic_planning.prediction import get_median_error, filter_for_dimension
 
 
+# parameter ranges searched by calculate_prediction_error (k_mid is always k + 0.1)
+DEFAULT_PARAMETER_GRID = {'c': np.arange(1.0, 2.0, 0.1),
+                          'k': np.arange(0, 0.9, 0.1),
+                          'k_food': np.arange(1.1, 2.0, 0.1)}
+
+
+def get_parameter_grid(parameter_grid=None):
+    '''
+    Return parameter values searched by calculate_prediction_error. Values are used as given,
+    rounded to 6 decimals only to remove float noise (e.g., from np.arange).
+
+    Parameters
+    ----------
+    parameter_grid : dictionary, optional
+        Values for 'c', 'k' (strong) and 'k_food'; missing keys use DEFAULT_PARAMETER_GRID.
+        The default is None.
+
+    Raises
+    ------
+    Exception if two values of a parameter are equal after rounding.
+
+    Returns
+    -------
+    grid : dictionary
+        Parameter -> list of values.
+
+    '''
+    grid = {}
+    
+    for key, values in dict(DEFAULT_PARAMETER_GRID, **(parameter_grid or {})).items():
+        grid[key] = [round(float(value), 6) for value in values]
+        
+        if len(set(grid[key])) != len(grid[key]):
+            raise Exception('Duplicate values in parameter grid for {}: {}'.format(key, list(values)))
+    
+    return grid
+
+
 def calculate_prediction_error(data, distances_dict, error_function, n=10, 
                              dimensions=[[2, 'xy'], [3, 'xyz']], 
                              seqcol='sequence', coords='coordinates', error='error',
-                             use_string_for_seq=False):
+                             use_string_for_seq=False, parameter_grid=None):
     '''
     Calculates prediction error for all combinations of parameter values (c, k, dimension).
 
@@ -38,6 +75,10 @@ def calculate_prediction_error(data, distances_dict, error_function, n=10,
     error : str, optional
         Column of dataframe containing error for random samping of sequence
         (only relevant when using editdist prediction). The default is 'error'.
+    
+    parameter_grid : dictionary, optional
+        Values to search for 'c', 'k' (strong) and 'k_food' (see get_parameter_grid);
+        missing keys use DEFAULT_PARAMETER_GRID. The default is None.
 
     Returns
     -------
@@ -46,63 +87,31 @@ def calculate_prediction_error(data, distances_dict, error_function, n=10,
 
     '''
 
+    import pandas as pd
+
     results = pd.DataFrame()
+    grid = get_parameter_grid(parameter_grid)
     
     for row in range(0, len(data)):
         # get episode information from input row
-        coordinates = {key: ast.literal_eval(value) for key, value in
-                       (elem.split(': ') for elem in data.at[row, coords].split(';'))}
-
-        start_coordinates = list(ast.literal_eval(data.at[row, 'start_coordinates']))
-        ID = str(data.at[row,'ID'])
-        
-        if use_string_for_seq == True:
-            seq = str(data.at[row, seqcol])
-            objects = list(data.at[row, seqcol])
-        else:
-            seq = [elem for elem in data.at[row, seqcol].split(',')]
-            objects = [elem for elem in data.at[row, seqcol].split(',')]
-
-        # get list of objects that have relational dependencies, if any (else set to empty list)
-        try:
-            strong_k = list(data.at[row, 'strong_k'].split(','))
-        except AttributeError:
-            strong_k = []
-
-        try:
-            mid_k = list(data.at[row, 'mid_k'].split(','))
-        except AttributeError:
-            mid_k = []
-
-        try:
-            food_k = list(data.at[row, 'food_k'].split(','))
-        except AttributeError:
-            food_k = []
-
-        
+        episode = parse_episode(data, row, seqcol, coords, use_string_for_seq)
+        ID = episode['ID']
 
         # go through parameter ranges
         # set k to current param if object has relational dependencies, else 1.0
-        for k2 in np.arange(1.1, 2.0, 0.1):
-            k_food = round(k2, 2)
-            k1 = {obj: k_food if obj in food_k else 1.0 for obj in objects}
-
-            for k in np.arange(0, 0.9, 0.1):
-                k_strong = round(k, 2)
-                k_mid = round(k + 0.1, 2)
-                k1 = {obj: k_strong if obj in strong_k else k_mid if obj in mid_k else round(k1[obj], 2) for obj in
-                      objects}
-
-                for c in np.arange(1.0, 2.0, 0.1):
-                    c = round(c, 1)
+        for k_food in grid['k_food']:
+            for k_strong in grid['k']:
+                k_mid = round(k_strong + 0.1, 6)
+
+                for c in grid['c']:
                     # set c to current param if object contained, else 1.0
-                    c1 = {obj: c if obj in data.at[row, 'containment'] else 1.0 for obj in objects}
+                    c1, k1 = get_parameter_dicts(episode, c, k_strong, k_mid, k_food)
 
                     for dim in dimensions:
                         # get median error for parameter combination based on error function
-                        median = get_median_error(error_function, row, ID, objects, coordinates, start_coordinates, 
-                                                  c1, k1, dim,
-                                                  seq, distances_dict, n)
+                        median = get_median_error(error_function, row, ID, episode['objects'],
+                                                  episode['coordinates'], episode['start_coordinates'],
+                                                  c1, k1, dim, episode['sequence'], distances_dict, n)
 
                         # save parameter combination as column name in results
                         params = 'c: ' + str(c) + '; k: ' + str(k_strong) + ',' + str(k_mid) + ',' + str(
@@ -226,6 +235,8 @@ def read_data(file, use_string_for_seq=False):
     df : dataframe with sequence + object information
 
     '''
+    import pandas as pd
+    
     df = pd.read_csv(file, header=0)
     
     for row in range(0,len(df)):
@@ -262,6 +273,8 @@ def read_results(file):
     results : results as pandas dataframe
 
     '''
+    import pandas as pd
+    
     results = pd.read_csv(file, header=0)
     results = results.T
     results.reset_index(drop=True, inplace=True)
@@ -301,4 +314,153 @@ def check_to_float(x):
     try:
         return float(x)
     except ValueError:
-        return x
\ No newline at end of file
+        return x
+
+
+def parse_episode(data, row, seqcol='sequence', coords='coordinates', use_string_for_seq=False):
+    '''
+    Get episode information (objects, coordinates, relational dependencies) from input row.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Generated with read_data function from csv, contains information on objects and sequence.
+    row : int
+        Row number in dataframe.
+    seqcol : str, optional
+        Column of dataframe containing sequence. The default is 'sequence'.
+    coords : str, optional
+        Column of dataframe containing coordinates. The default is 'coordinates'.
+    use_string_for_seq : bool, optional
+        Sequence is a string of single-character objects. The default is False.
+
+    Returns
+    -------
+    episode : dictionary
+        ID, sequence, objects, coordinates, start_coordinates, strong_k, mid_k, food_k
+        and containment of episode.
+
+    '''
+    coordinates = {key: ast.literal_eval(value) for key, value in
+                   (elem.split(': ') for elem in data.at[row, coords].split(';'))}
+    
+    if use_string_for_seq == True:
+        sequence = str(data.at[row, seqcol])
+        objects = list(data.at[row, seqcol])
+    else:
+        sequence = [elem for elem in data.at[row, seqcol].split(',')]
+        objects = [elem for elem in data.at[row, seqcol].split(',')]
+    
+    episode = {'ID': str(data.at[row, 'ID']),
+               'sequence': sequence,
+               'objects': objects,
+               'coordinates': coordinates,
+               'start_coordinates': list(ast.literal_eval(data.at[row, 'start_coordinates'])),
+               'containment': ''}
+    
+    # objects in containment, if any (NaN -> empty string, so no object counts as contained)
+    containment = data.at[row, 'containment']
+    
+    if not (isinstance(containment, float) and np.isnan(containment)):
+        episode['containment'] = str(containment)
+    
+    # objects with relational dependencies, if any (else empty list)
+    for column in ['strong_k', 'mid_k', 'food_k']:
+        try:
+            episode[column] = list(data.at[row, column].split(','))
+        except AttributeError:
+            episode[column] = []
+    
+    return episode
+
+
+def get_parameter_dicts(episode, c, k_strong, k_mid, k_food):
+    '''
+    Set c and k for all objects in episode (as in calculate_prediction_error).
+
+    Parameters
+    ----------
+    episode : dictionary
+        Episode information generated with parse_episode.
+    c : float
+        Parameter value for contained objects.
+    k_strong, k_mid, k_food : float
+        Parameter values for objects with relational dependencies.
+
+    Returns
+    -------
+    c1 : dictionary
+        Parameter values for containment for all objects.
+    k1 : dictionary
+        Parameter values for relational dependencies for all objects.
+
+    '''
+    c1 = {obj: c if obj in episode['containment'] else 1.0 for obj in episode['objects']}
+    k1 = {obj: k_strong if obj in episode['strong_k'] else k_mid if obj in episode['mid_k']
+          else k_food if obj in episode['food_k'] else 1.0 for obj in episode['objects']}
+    
+    return c1, k1
+
+
+def parse_parameters(params):
+    '''
+    Get parameter values from results column name (e.g., 'c: 1.2; k: 0.3,0.4,1.5; xyz').
+
+    Parameters
+    ----------
+    params : str
+        Column name generated by calculate_prediction_error.
+
+    Returns
+    -------
+    parameters : dictionary
+        c, k_strong, k_mid, k_food and dimension (as [int, str]).
+
+    '''
+    c, k, dimension = [elem.strip() for elem in params.split(';')]
+    k_strong, k_mid, k_food = [float(x) for x in k[3:].split(',')]
+    
+    return {'c': float(c[3:]), 'k_strong': k_strong, 'k_mid': k_mid, 'k_food': k_food,
+            'dimension': [len(dimension), dimension]}
+
+
+def get_sequences(data, seqcol='sequence'):
+    '''
+    Return observed sequences of all episodes.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Dataframe with sequence information.
+    seqcol : str, optional
+        Column of dataframe containing sequence. The default is 'sequence'.
+
+    Returns
+    -------
+    sequence_list : list
+        Sequences as in input file.
+
+    '''
+    return [str(data.at[row, seqcol]) for row in range(0, len(data))]
+
+
+def save_sequences(sequence_list, output_file):
+    '''
+    Save sequences to text file, one sequence per line (e.g. as input for RNN baseline).
+
+    Parameters
+    ----------
+    sequence_list : list
+        Sequences generated with get_sequences.
+    output_file : str
+        Save path for file.
+
+    Returns
+    -------
+    None.
+
+    '''
+    with open(output_file, 'w') as file:
+        for sequence in sequence_list:
+            file.write(sequence)
+            file.write('\n')
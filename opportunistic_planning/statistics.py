@@ -0,0 +1,375 @@
+import warnings
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+
+NON_PARAMETER_COLUMNS = ['sequence', 'error', 'ID']
+SUMMARY_ROWS = ['mean', 'median']
+
+# matrix shared with worker processes (set once per process by _init_worker)
+_worker_matrix = None
+
+# exact null distributions of the signed-rank statistic, by number of pairs
+_signed_rank_cdfs = {}
+
+
+def get_error_matrix(results):
+    '''
+    Extract episode x parameter combination error matrix from results dataframe.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Results dataframe generated with calculate_prediction_error
+        (rows added by get_lowest_error are ignored).
+
+    Returns
+    -------
+    matrix : numpy.ndarray
+        Error values, shape (number of episodes, number of parameter combinations).
+    columns : list
+        Parameter combination (column name) for each column of matrix.
+
+    '''
+
+    import pandas as pd
+
+    columns = [col for col in results.columns if col not in NON_PARAMETER_COLUMNS]
+    rows = [idx for idx in results.index if idx not in SUMMARY_ROWS]
+    matrix = results.loc[rows, columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+    return matrix, columns
+
+
+def _init_worker(matrix):
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _bootstrap_worker(args):
+    return _bootstrap_chunk(_worker_matrix, *args)
+
+
+def _bootstrap_chunk(matrix, statistic, n_resamples, seed, max_elements):
+    '''
+    Compute statistic for n_resamples bootstrap samples of the episodes (rows) of matrix.
+    The same resampled episode indices are used for all columns.
+
+    '''
+
+    rng = np.random.default_rng(seed)
+    n_episodes, n_columns = matrix.shape
+    indices = rng.integers(0, n_episodes, size=(n_resamples, n_episodes))
+
+    if statistic == 'mean':
+        # count how often each episode is drawn -> weighted mean as matrix product
+        offsets = indices + np.arange(n_resamples)[:, None] * n_episodes
+        counts = np.bincount(offsets.ravel(), minlength=n_resamples * n_episodes)
+        counts = counts.reshape(n_resamples, n_episodes).astype(float)
+
+        valid = ~np.isnan(matrix)
+        values = np.where(valid, matrix, 0.0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (counts @ values) / (counts @ valid)
+
+    # median: resample in batches to limit memory of the (batch, episodes, columns) array
+    batch_size = max(1, max_elements // max(1, n_episodes * n_columns))
+    estimates = np.empty((n_resamples, n_columns))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)  # all-NaN columns
+
+        for start in range(0, n_resamples, batch_size):
+            stop = min(start + batch_size, n_resamples)
+            estimates[start:stop] = np.nanmedian(matrix[indices[start:stop]], axis=1)
+
+    return estimates
+
+
+def bootstrap_ci(results, statistic='mean', n_bootstrap=1000, confidence=0.95, seed=None,
+                 n_jobs=1, chunk_size=250, max_elements=2**24):
+    '''
+    Calculate percentile bootstrap confidence intervals for mean or median error of all
+    parameter combinations at once (episode resampling indices are shared across combinations).
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Results dataframe generated with calculate_prediction_error.
+    statistic : str, optional
+        Statistic to bootstrap. Options: mean, median. The default is 'mean'.
+    n_bootstrap : int, optional
+        Number of bootstrap samples. The default is 1000.
+    confidence : float, optional
+        Confidence level of the intervals. The default is 0.95.
+    seed : int, optional
+        Seed for random number generator. The default is None.
+    n_jobs : int, optional
+        Number of worker processes. The default is 1 (no multiprocessing).
+    chunk_size : int, optional
+        Number of bootstrap samples per task. Results for a given seed do not depend
+        on n_jobs. The default is 250.
+    max_elements : int, optional
+        Maximum number of array elements held in memory per batch when bootstrapping
+        the median. The default is 2**24.
+
+    Returns
+    -------
+    ci : pandas.DataFrame
+        Statistic, lower and upper bound for each parameter combination (index).
+
+    '''
+
+    import pandas as pd
+
+    if statistic not in ('mean', 'median'):
+        raise Exception('Unknown statistic {}, use mean or median'.format(statistic))
+
+    matrix, columns = get_error_matrix(results)
+
+    chunks = [min(chunk_size, n_bootstrap - start) for start in range(0, n_bootstrap, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(statistic, size, chunk_seed, max_elements) for size, chunk_seed in zip(chunks, seeds)]
+
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(matrix,)) as executor:
+            estimates = list(executor.map(_bootstrap_worker, tasks))
+    else:
+        estimates = [_bootstrap_chunk(matrix, *task) for task in tasks]
+
+    estimates = np.concatenate(estimates, axis=0)
+    alpha = (1 - confidence) / 2
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        lower, upper = np.nanpercentile(estimates, [alpha * 100, (1 - alpha) * 100], axis=0)
+        observed = np.nanmean(matrix, axis=0) if statistic == 'mean' else np.nanmedian(matrix, axis=0)
+
+    ci = pd.DataFrame({statistic: observed, 'lower': lower, 'upper': upper}, index=columns)
+
+    return ci
+
+
+# largest number of nonzero pairs for which the exact Wilcoxon distribution is used (as scipy)
+EXACT_WILCOXON_MAX_N = 50
+
+
+def _signed_rank_cdf(n):
+    # P(W <= w) under H0 for n pairs without ties: count subsets of ranks 1..n with sum w
+    if n not in _signed_rank_cdfs:
+        counts = np.zeros(n * (n + 1) // 2 + 1)
+        counts[0] = 1
+
+        for rank in range(1, n + 1):
+            counts[rank:] = counts[rank:] + counts[:-rank]
+
+        _signed_rank_cdfs[n] = np.cumsum(counts) / 2.0 ** n
+
+    return _signed_rank_cdfs[n]
+
+
+def _wilcoxon(differences):
+    '''
+    Vectorized two-sided Wilcoxon signed-rank test for each column of differences
+    (zero differences and NaN pairs discarded). Statistic is min(W+, W-). p-value is exact
+    for n <= EXACT_WILCOXON_MAX_N without ties or zeros, otherwise normal approximation
+    with tie correction (no continuity correction).
+
+    '''
+
+    from scipy.stats import norm, rankdata
+
+    has_zero = (differences == 0).any(axis=0)
+    differences = np.where(np.isnan(differences), 0.0, differences)  # NaN pairs are omitted
+    nonzero = differences != 0
+    n = nonzero.sum(axis=0)
+
+    # rank zeros below all other values, then shift ranks so nonzero differences start at 1
+    absolute = np.where(nonzero, np.abs(differences), -1.0)
+    n_zero = differences.shape[0] - n
+    ranks = np.where(nonzero, rankdata(absolute, axis=0) - n_zero, 0.0)
+
+    # size of tie group for each element -> tie correction sum(t^3 - t) = sum(t_i^2 - 1)
+    tie_size = rankdata(absolute, method='max', axis=0) - rankdata(absolute, method='min', axis=0) + 1
+    tie_term = np.where(nonzero, tie_size ** 2 - 1, 0).sum(axis=0)
+
+    w_plus = np.where(differences > 0, ranks, 0.0).sum(axis=0)
+    statistic = np.minimum(w_plus, n * (n + 1) / 2 - w_plus)
+    expected = n * (n + 1) / 4
+    variance = n * (n + 1) * (2 * n + 1) / 24 - tie_term / 48
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (w_plus - expected) / np.sqrt(variance)
+    p_value = 2 * norm.sf(np.abs(z))
+
+    # exact distribution for small samples without ties or zeros
+    exact = (n > 0) & (n <= EXACT_WILCOXON_MAX_N) & (tie_term == 0) & ~has_zero
+
+    for column in np.flatnonzero(exact):
+        cdf = _signed_rank_cdf(int(n[column]))
+        p_value[column] = min(1.0, 2 * cdf[int(round(statistic[column]))])
+
+    return statistic, p_value, n
+
+
+def _ttest(differences):
+    '''
+    Vectorized paired t-test for each column of differences (NaN pairs omitted).
+
+    '''
+
+    from scipy.stats import t as t_distribution
+
+    n = (~np.isnan(differences)).sum(axis=0)
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        mean = np.nanmean(differences, axis=0)
+        std = np.nanstd(differences, axis=0, ddof=1)
+        t_value = mean / (std / np.sqrt(n))
+    p_value = 2 * t_distribution.sf(np.abs(t_value), n - 1)
+
+    return t_value, p_value, n
+
+
+def holm_correction(p_values):
+    '''
+    Adjust p-values for multiple comparisons (Holm-Bonferroni). NaN values are ignored.
+
+    Parameters
+    ----------
+    p_values : array-like
+        Unadjusted p-values.
+
+    Returns
+    -------
+    adjusted : numpy.ndarray
+        Adjusted p-values.
+
+    '''
+
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full_like(p_values, np.nan)
+    valid = ~np.isnan(p_values)
+
+    valid_p = p_values[valid]
+    m = len(valid_p)
+    order = np.argsort(valid_p)
+    scaled = np.maximum.accumulate((m - np.arange(m)) * valid_p[order])
+
+    corrected = np.empty(m)
+    corrected[order] = np.minimum(scaled, 1.0)
+    adjusted[valid] = corrected
+
+    return adjusted
+
+
+def paired_tests(results, reference=None, baselines=None, test='wilcoxon'):
+    '''
+    Compare reference parameter combination to all other combinations (or to baselines)
+    with paired tests over episodes, computed for all comparisons at once.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Results dataframe generated with calculate_prediction_error.
+    reference : str, optional
+        Column name of reference parameter combination.
+        The default is None (combination with lowest mean error).
+    baselines : dictionary, optional
+        Baseline name -> error values per episode (e.g., CPT, RNN).
+        The default is None (compare to all other parameter combinations).
+    test : str, optional
+        Paired test to use. Options: wilcoxon (signed-rank test), ttest (paired t-test).
+        The default is 'wilcoxon'.
+
+    Wilcoxon follows scipy.stats.wilcoxon (two-sided, zero_method='wilcox', statistic
+    min(W+, W-)): exact p-value for up to EXACT_WILCOXON_MAX_N pairs without ties or zeros,
+    otherwise normal approximation with tie correction. The t-test matches
+    scipy.stats.ttest_rel with nan_policy='omit'. check_statistics.py compares both to scipy.
+
+    Returns
+    -------
+    comparison : pandas.DataFrame
+        Mean difference (reference - other), test statistic, p-value, Holm-adjusted p-value
+        and number of pairs used for each compared combination/baseline (index).
+
+    '''
+
+    import pandas as pd
+
+    if test not in ('wilcoxon', 'ttest'):
+        raise Exception('Unknown test {}, use wilcoxon or ttest'.format(test))
+
+    matrix, columns = get_error_matrix(results)
+
+    if reference is None:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            reference = columns[np.nanargmin(np.nanmean(matrix, axis=0))]
+
+    reference_values = matrix[:, columns.index(reference)]
+
+    if baselines is None:
+        others = [col for col in columns if col != reference]
+        other_values = matrix[:, [columns.index(col) for col in others]]
+    else:
+        others = list(baselines.keys())
+        other_values = np.column_stack([np.asarray(baselines[name], dtype=float) for name in others])
+
+        if other_values.shape[0] != len(reference_values):
+            raise Exception('Number of baseline values != number of episodes ({})'.format(
+                len(reference_values)))
+
+    differences = reference_values[:, None] - other_values
+
+    if test == 'wilcoxon':
+        statistic, p_value, n = _wilcoxon(differences)
+    else:
+        statistic, p_value, n = _ttest(differences)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        mean_difference = np.nanmean(differences, axis=0)
+
+    comparison = pd.DataFrame({'mean_difference': mean_difference, 'statistic': statistic,
+                               'p_value': p_value, 'p_adjusted': holm_correction(p_value),
+                               'n': n}, index=others)
+    comparison.index.name = reference
+
+    return comparison
+
+
+def friedman_test(results, columns=None):
+    '''
+    Friedman test over parameter combinations (episodes with missing values are dropped).
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Results dataframe generated with calculate_prediction_error.
+    columns : list, optional
+        Parameter combinations to compare. The default is None (all combinations).
+
+    Returns
+    -------
+    statistic : float
+        Friedman chi-square statistic.
+    p_value : float
+        p-value of the test.
+
+    '''
+
+    from scipy.stats import friedmanchisquare
+
+    matrix, all_columns = get_error_matrix(results)
+
+    if columns is not None:
+        matrix = matrix[:, [all_columns.index(col) for col in columns]]
+
+    matrix = matrix[~np.isnan(matrix).any(axis=1)]
+    statistic, p_value = friedmanchisquare(*matrix.T)
+
+    return statistic, p_value
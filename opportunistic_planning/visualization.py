@@ -1,22 +1,23 @@
-import matplotlib.colors
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from opportunistic_planning.processing import parse_parameters
+from opportunistic_planning.statistics import get_error_matrix
 
 
 def plot_dimensions(results_df, save=False, rnn=None):
     # TODO: adapt to only consider given dimensions (e.g. only xy, xyz)
+    import matplotlib.colors
+    import matplotlib.pyplot as plt
     
-    parameter_c = [float(x[3:6]) for x in results_df.columns.tolist() \
-                   if x != 'sequence' and x != 'ID' and x != 'error']
-        
-    parameter_k = [float(x[11:14]) for x in results_df.columns.tolist() \
-                   if x != 'sequence' and x != 'ID' and x != 'error']
+    columns = [x for x in results_df.columns.tolist() if x != 'sequence' and x != 'ID' and x != 'error']
+    parameters = [parse_parameters(x) for x in columns]
     
-    dimensions = [x.strip() for x in results_df.columns[:-3].str.split(';').str[2]]
-    median = [x for x in results_df.loc['median'].tolist() if pd.notnull(x)]
+    parameter_c = [x['c'] for x in parameters]
+    parameter_k = [x['k_strong'] for x in parameters]
+    dimensions = [x['dimension'][1] for x in parameters]
+    median = results_df.loc['median', columns].astype(float).tolist()
     colors = ['#e74c3c', '#0064a3', '#70b85d', '#287d78', '#54d0ff', '#f1e664', '#fd8f00']
     dimension_number = [0 if x=='x' else 1 if x=='y' else 2 if x=='z' \
                         else 3 if x=='xy' else 4 if x=='xz' \
@@ -71,6 +72,7 @@ def plot_dimensions(results_df, save=False, rnn=None):
 
 def plot_comparison_to_baselines(results_median, lowest_mean_idx, lowest_median,
                                  save=False, cpt=None, rnn=None):
+    import matplotlib.pyplot as plt
     
     IDs = results_median['ID'][:-2]
     sequences = results_median['sequence'][:-2].values
@@ -116,6 +118,213 @@ def plot_comparison_to_baselines(results_median, lowest_mean_idx, lowest_median,
         plt.savefig(filename, bbox_inches='tight', dpi=600)
     
     plt.show()
+
+
+def aggregate_dimensions(results_df, statistic='median', aggfunc='min'):
+    '''
+    Pivot error values to one c x k surface per dimension.
+
+    Parameters
+    ----------
+    results_df : pandas.DataFrame
+        Results dataframe generated with calculate_prediction_error.
+    statistic : str, optional
+        Statistic over episodes for each parameter combination (mean or median).
+        The default is 'median'.
+    aggfunc : str, optional
+        Aggregation over remaining parameters (k_mid, k_food) for each (c, k) cell.
+        The default is 'min'.
+
+    Raises
+    ------
+    Exception if statistic unknown.
+
+    Returns
+    -------
+    surfaces : dictionary
+        Dimension -> pandas.DataFrame with index k (strong), columns c.
+
+    '''
+
+    import pandas as pd
+    
+    if statistic not in ('mean', 'median'):
+        raise Exception('Unknown statistic {}, use mean or median'.format(statistic))
+    
+    matrix, columns = get_error_matrix(results_df)
+    values = np.nanmedian(matrix, axis=0) if statistic == 'median' else np.nanmean(matrix, axis=0)
+    
+    parsed = [parse_parameters(col) for col in columns]
+    parameters = pd.DataFrame({'c': [x['c'] for x in parsed],
+                               'k': [x['k_strong'] for x in parsed],
+                               'dimension': [x['dimension'][1] for x in parsed],
+                               'error': values})
+    
+    surfaces = {dim: group.pivot_table(index='k', columns='c', values='error', aggfunc=aggfunc)
+                for dim, group in parameters.groupby('dimension', sort=False)}
+    
+    return surfaces
+
+
+def plot_dimensions_aggregated(results_df, filename, statistic='median', aggfunc='min',
+                               dpi=150, rnn=None, error_label='prediction error'):
+    '''
+    Render pre-aggregated error surfaces (one heatmap per dimension) straight to file
+    using the Agg backend (no interactive window).
+
+    Parameters
+    ----------
+    results_df : pandas.DataFrame
+        Results dataframe generated with calculate_prediction_error.
+    filename : str
+        Output path of plot.
+    statistic : str, optional
+        Statistic over episodes (mean or median). The default is 'median'.
+    aggfunc : str, optional
+        Aggregation over k_mid/k_food for each (c, k) cell. The default is 'min'.
+    dpi : int, optional
+        Resolution of saved plot. The default is 150.
+    rnn : list, optional
+        RNN baseline errors, mean is marked on colorbar. The default is None.
+    error_label : str, optional
+        Colorbar label after statistic, e.g. 'accumulated prequential error' or
+        'normalized edit distance'. The default is 'prediction error'.
+
+    Returns
+    -------
+    filename : str
+        Output path of plot.
+
+    '''
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    surfaces = aggregate_dimensions(results_df, statistic, aggfunc)
+    vmin = min(np.nanmin(surface.values) for surface in surfaces.values())
+    vmax = max(np.nanmax(surface.values) for surface in surfaces.values())
+    
+    fig = Figure(figsize=(4 * len(surfaces), 3.6))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(1, len(surfaces), squeeze=False)[0]
+    
+    for ax, (dim, surface) in zip(axes, surfaces.items()):
+        mesh = ax.pcolormesh(surface.columns.values, surface.index.values, surface.values,
+                             shading='nearest', cmap='viridis', vmin=vmin, vmax=vmax, rasterized=True)
+        ax.set_title(dim)
+        ax.set_xlabel('parameter c')
+    
+    axes[0].set_ylabel('parameter k')
+    
+    cb = fig.colorbar(mesh, ax=list(axes))
+    cb.set_label(statistic + ' ' + error_label)
+    
+    if rnn is not None:
+        cb.ax.axhline(np.mean(rnn), color='limegreen', linewidth=2)
+    
+    fig.savefig(filename, bbox_inches='tight', dpi=dpi)
     
+    return filename
+
+
+def plot_comparison_aggregated(results_median, lowest_mean_idx, filename, cpt=None, rnn=None, dpi=150):
+    '''
+    Render comparison of best parameter combination to baselines straight to file
+    using the Agg backend (rasterized scatter, no per-episode tick labels).
+
+    Parameters
+    ----------
+    results_median : pandas.DataFrame
+        Results dataframe generated with calculate_prediction_error/get_lowest_error.
+    lowest_mean_idx : col index
+        Column index where mean error is lowest (from get_lowest_error).
+    filename : str
+        Output path of plot.
+    cpt : list, optional
+        CPT baseline error per episode. The default is None.
+    rnn : list, optional
+        RNN baseline error per episode. The default is None.
+    dpi : int, optional
+        Resolution of saved plot. The default is 150.
+
+    Returns
+    -------
+    filename : str
+        Output path of plot.
+
+    '''
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    matrix, columns = get_error_matrix(results_median)
+    results = matrix[:, columns.index(lowest_mean_idx[0])]
+    x = np.arange(len(results))
+    
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    
+    series = [(results, 'model-generated', 'darkviolet')]
+    
+    if cpt is not None:
+        series.append((np.asarray(cpt, dtype=float), 'CPT baseline', 'dodgerblue'))
+    
+    if rnn is not None:
+        series.append((np.asarray(rnn, dtype=float), 'RNN baseline', 'limegreen'))
+    
+    for values, label, color in series:
+        median = np.nanmedian(values)
+        ax.scatter(x, values, marker='o', s=4, color=color, alpha=0.5, linewidths=0, rasterized=True,
+                   label=label + ' median: ' + str(round(median, 3)))
+        ax.axhline(median, color=color, alpha=0.95, linewidth=2)
+    
+    ax.set_ylabel('accumulated prediction error', fontsize=12)
+    ax.set_xlabel('sequence', fontsize=12)
+    ax.margins(0.01)
+    ax.legend(fontsize=10, framealpha=0.8, loc='upper right', markerscale=3)
+    
+    fig.savefig(filename, bbox_inches='tight', dpi=dpi)
+    
+    return filename
+
+
+PLOT_FUNCTIONS = {'dimensions': plot_dimensions_aggregated,
+                  'comparison': plot_comparison_aggregated}
+
+
+def _render_plot(job):
+    job = dict(job)
+    plot = job.pop('plot')
+    
+    return PLOT_FUNCTIONS[plot](**job)
+
+
+def export_plots(jobs, n_jobs=1):
+    '''
+    Render many aggregated plots to files, in parallel processes if n_jobs > 1.
+
+    Parameters
+    ----------
+    jobs : list of dictionaries
+        Each job contains 'plot' (dimensions or comparison) and the keyword arguments
+        of the corresponding function (including filename).
+    n_jobs : int, optional
+        Number of worker processes. The default is 1.
+
+    Returns
+    -------
+    filenames : list
+        Output paths of rendered plots.
+
+    '''
+
+    for job in jobs:
+        if job.get('plot') not in PLOT_FUNCTIONS:
+            raise Exception('Unknown plot {}, use dimensions or comparison'.format(job.get('plot')))
     
+    if n_jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(_render_plot, jobs))
     
+    return [_render_plot(job) for job in jobs]